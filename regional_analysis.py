@@ -1,33 +1,124 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 import re
 import os
+import hashlib
+from collections import defaultdict
+from pandas.api.types import is_numeric_dtype
+
+# xlsx 파서: Rust 기반 python-calamine을 우선 사용하고, 설치되지 않은 환경에서는 openpyxl로 대체
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# 시트 캐시 형식 버전: get_df의 후처리(문자열 변환 등)를 바꾸면 올려서 이전 형식의 캐시 파일을 무효화
+CACHE_VERSION = 1
 
 # --- 1. 페이지 설정 및 데이터 로드 ---
 st.set_page_config(page_title="지역별 통합 데이터 분석 시스템", layout="wide")
 
-@st.cache_data
+# 연도는 네 자리(19xx/20xx)만 인정: '_50~59세', '_65세 이상' 같은 연령대가 연도로 읽히지 않도록 함
+# (뒤에 '_계' 등 접미어가 붙는 컬럼이 있으므로 끝에 고정하지 않음)
+YEAR_RE = re.compile(r'_((?:19|20)\d{2})(?!\d)')
+
+# 컬럼명 -> (기본 변수명, 연도) 색인: 데이터 로드 시 한 번만 만들고 이후에는 dict 조회로 대체
+def build_col_index(df_columns) -> dict:
+    cols = pd.Index(df_columns)
+    # 연도로 인식한 첫 부분만 지워 기본 변수명을 만듦
+    bases = cols.str.replace(YEAR_RE, '', n=1, regex=True).str.strip()
+    # 연도 추출도 컬럼 전체에 대해 한 번에 처리
+    years = pd.to_numeric(cols.str.extract(YEAR_RE, expand=False), errors='coerce')
+    return {c: (b, None if np.isnan(y) else int(y)) for c, b, y in zip(cols, bases, years)}
+
+# 기본 변수명 -> 연도별 컬럼 목록 (역색인): 변수별 컬럼 검색을 dict 조회 한 번으로 처리
+def build_base_index(col_meta) -> dict:
+    base_to_cols = defaultdict(list)
+    for c, (base, _) in col_meta.items():
+        base_to_cols[base].append(c)
+    return dict(base_to_cols)
+
+# 넓은 표(지역 x 지표_연도)를 [기본 변수명, 지역] 인덱스의 긴 표(year, value)로 한 번만 변환
+def build_long(df, loc_column, col_meta):
+    year_cols = [c for c, (_, y) in col_meta.items() if y is not None]
+    long = df[[loc_column] + year_cols].melt(id_vars=[loc_column], var_name="item", value_name="value")
+    # melt는 컬럼 순서대로 행을 쌓으므로 컬럼별 값을 행 수만큼 반복해 바로 채움
+    long['base_name'] = np.repeat([col_meta[c][0] for c in year_cols], len(df))
+    long['year'] = np.repeat(np.array([col_meta[c][1] for c in year_cols], dtype=np.int16), len(df))
+    long['value'] = pd.to_numeric(long['value'], errors='coerce').astype(np.float64)
+    long = long.dropna(subset=['value', loc_column])
+    # (기본 변수명, 지역, 연도) 순으로 정렬해 두면 조회는 이진 탐색 구간 자르기로 끝남
+    # (인덱스 레벨에서 범주형은 없는 지역명 탐색 시 오류가 나므로 일반 문자열로 둠)
+    long[loc_column] = long[loc_column].astype(str)
+    return long.sort_values(['base_name', loc_column, 'year']).set_index(['base_name', loc_column])[['year', 'value']]
+
+# 읽기 전용 참조 데이터이므로 cache_resource로 보관 (rerun마다 DataFrame 해시/복사 생략)
+@st.cache_resource
 def load_combined_data():
     mental_file = "(26-02-23)regional_data.xlsx"
     econ_file = "(26-02-23)data_for_econ.xlsx"
     klosa_file = "(26-02-23)KLoSA.xlsx" # KLoSA 파일 추가
     
     base_path = os.path.dirname(os.path.abspath(__file__))
+    # 파싱 결과 캐시: 사용자 전용 캐시 폴더에 두어 같은 사용자의 여러 프로세스/재시작 간 공유 (데이터 폴더가 읽기 전용이어도 동작)
+    # (모두가 쓸 수 있는 /tmp 공용 경로는 다른 사용자가 파일을 심어둘 수 있으므로 사용하지 않음)
+    cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "regional_dataset")
     
-    def get_df(file_name, sheet):
+    def get_df(file_name, sheets):
         path = os.path.join(base_path, file_name)
         if not os.path.exists(path): path = file_name
-        return pd.read_excel(path, sheet_name=sheet, engine='openpyxl')
+        # 원본의 수정시각+크기를 캐시 파일명에 넣어, 파일이 바뀌면 자동으로 새 캐시를 사용
+        sig = f"{os.path.getmtime(path):.0f}_{os.path.getsize(path)}"
+        # 같은 사용자가 여러 체크아웃(예: 스테이징/운영)을 돌려도 캐시가 섞이거나 서로 지우지 않도록 원본 절대경로 해시를 붙임
+        name = f"{os.path.basename(path)}.{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]}"
+        # 형식 버전과 파서 엔진도 넣어, 코드/엔진이 바뀌면 이전 방식으로 만든 캐시를 읽지 않음
+        cache_paths = {s: os.path.join(cache_dir, f"{name}.{s}.{sig}.v{CACHE_VERSION}.{EXCEL_ENGINE}.feather") for s in sheets}
+        # 캐시(Arrow IPC)가 있으면 xlsx 파싱 없이 바로 읽음
+        frames = {}
+        for s, p in cache_paths.items():
+            if not os.path.exists(p): continue
+            try:
+                frames[s] = pd.read_feather(p)
+            except Exception:
+                # 깨진 캐시 파일은 지우고 해당 시트만 원본에서 다시 파싱
+                try: os.remove(p)
+                except OSError: pass
+        missing = [s for s in sheets if s not in frames]
+        if missing:
+            # 필요한 시트를 한 번의 워크북 파싱으로 모두 읽음
+            for s, df in pd.read_excel(path, sheet_name=missing, engine=EXCEL_ENGINE).items():
+                # 숫자와 '-' 등이 섞인 object 컬럼은 Arrow로 저장할 수 없으므로 문자열로 통일
+                obj_cols = df.columns[df.dtypes == object]
+                df[obj_cols] = df[obj_cols].astype("string")
+                try:
+                    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+                    # 임시 파일에 쓴 뒤 교체: 동시에 뜬 다른 프로세스가 쓰다 만 캐시를 읽지 않도록 함
+                    tmp_path = f"{cache_paths[s]}.{os.getpid()}.tmp"
+                    try:
+                        df.to_feather(tmp_path)
+                        os.replace(tmp_path, cache_paths[s])
+                    finally:
+                        # 쓰기 도중 실패(디스크 부족 등)하면 교체되지 못한 임시 파일을 남기지 않음
+                        if os.path.exists(tmp_path): os.remove(tmp_path)
+                    # 원본이 바뀌기 전(이전 수정시각/크기)의 같은 시트 캐시는 정리
+                    prefix, current = f"{name}.{s}.", os.path.basename(cache_paths[s])
+                    for f in os.listdir(cache_dir):
+                        if f.startswith(prefix) and f.endswith(".feather") and f != current:
+                            os.remove(os.path.join(cache_dir, f))
+                except Exception:
+                    pass # 캐시 저장 실패는 무시하고 원본 데이터 사용
+                frames[s] = df
+        return [frames[s] for s in sheets]
 
     try:
         # 1. 데이터 로드
-        sido_m = get_df(mental_file, "시도")
-        sigungu_m = get_df(mental_file, "시군구")
-        sido_e = get_df(econ_file, "시도")
-        sigungu_e = get_df(econ_file, "시군구")
-        df_klosa = get_df(klosa_file, "Sheet3") # KLoSA 데이터 로드
+        sido_m, sigungu_m = get_df(mental_file, ["시도", "시군구"])
+        sido_e, sigungu_e = get_df(econ_file, ["시도", "시군구"])
+        df_klosa, = get_df(klosa_file, ["Sheet3"]) # KLoSA 데이터 로드
 
         # 2. 컬럼명 정리 및 병합
         if '시도별' in sido_e.columns: sido_e = sido_e.rename(columns={'시도별': '시도'})
@@ -38,13 +129,23 @@ def load_combined_data():
         
         # 시군구 데이터 통합 (정신건강 + 경제)
         df_sigungu = pd.merge(sigungu_m, sigungu_e, on="시군구", how="outer")
+
+        # 지역 컬럼은 범주형으로 변환 (isin 필터가 문자열 대신 정수 코드 비교로 처리됨)
+        df_sido['시도'] = df_sido['시도'].astype('category')
+        df_sigungu['시군구'] = df_sigungu['시군구'].astype('category')
+        df_sigungu['시군구별(1)'] = df_sigungu['시군구별(1)'].astype('category') # 기준 시도별 시군구 목록 필터용
+
+        # 3. 컬럼 색인 (분석 단위별): 병합 결과에 대해 한 번만 계산해 데이터와 함께 보관
+        col_meta = {"시도": build_col_index(df_sido.columns), "시군구": build_col_index(df_sigungu.columns)}
+        base_cols = {level: build_base_index(meta) for level, meta in col_meta.items()}
+        long_frames = {"시도": build_long(df_sido, "시도", col_meta["시도"]), "시군구": build_long(df_sigungu, "시군구", col_meta["시군구"])}
         
-        return df_sido, df_sigungu
+        return df_sido, df_sigungu, col_meta, base_cols, long_frames
     except Exception as e:
         st.error(f"❌ 파일을 읽는 중 오류 발생: {e}")
-        return None, None
+        return None, None, None, None, None
 
-df_sido, df_sigungu = load_combined_data()
+df_sido, df_sigungu, COL_META, BASE_COLS, LONG = load_combined_data()
 if df_sido is None: st.stop()
 
 # --- 2. 변수 매핑 (7. KLoSA 항목 추가) ---
@@ -58,30 +159,89 @@ VARIABLES_MAP = {
     "7. KLoSA (고령화패널)": ["평균연령", "KLoSA_", "Health_", "SubHealth_", "WorkLimit_", "depav_", "정신질환진단", "SatOver_", "Income_평균", "우울위험군_"]
 }
 
-def get_base_name(column_name):
-    return re.sub(r'_(\d{2,4})', '', column_name).strip()
+# 카테고리별 키워드를 하나의 정규식(alternation)으로 미리 컴파일
+CATEGORY_PATTERNS = {cat: re.compile('|'.join(map(re.escape, kws))) for cat, kws in VARIABLES_MAP.items()}
 
-def get_unique_vars(keywords, df):
-    matched = [c for c in df.columns if any(k in c for k in keywords)]
-    return sorted(list(set([get_base_name(c) for c in matched])))
+# 로드 후 컬럼은 바뀌지 않으므로 (분석 단위 → 카테고리 → 지표 tuple)을 복사 없이 공유하는 리소스로 캐시
+@st.cache_resource(show_spinner=False)
+def category_vars(region_level) -> dict:
+    col_meta = COL_META[region_level]
+    # 분석 단위마다 한 번에 전체 카테고리의 지표 목록을 만듦 (렌더링 루프는 (분석 단위, 카테고리) dict 조회만 수행)
+    return {cat: tuple(sorted({col_meta[c][0] for c in col_meta if pat.search(c)})) for cat, pat in CATEGORY_PATTERNS.items()}
 
-def process_data_v2(df, regions, var_name, loc_column):
-    var_cols = [c for c in df.columns if get_base_name(c) == var_name]
-    if not var_cols: return pd.DataFrame()
-    temp = df[df[loc_column].isin(regions)][[loc_column] + var_cols]
-    melted = temp.melt(id_vars=[loc_column], var_name="item", value_name="value")
-    
-    def extract_year(text):
-        match = re.search(r'_(\d{2,4})', text)
-        if match:
-            y = match.group(1)
-            full_year = f"20{y}" if len(y) == 2 and int(y) < 50 else y
-            return int(full_year)
-        return None
-        
-    melted['year'] = melted['item'].apply(extract_year)
-    melted['value'] = pd.to_numeric(melted['value'], errors='coerce')
-    return melted.dropna(subset=['year', 'value']).sort_values('year')
+# 아래 함수들은 (분석 단위, 지역 tuple, 지표명)을 키로 캐시됨 (분석 단위명 = 지역 컬럼명, 캐시 미스 때도 스피너 없이 처리)
+# 키 조합이 사실상 무한하므로 항목 수 상한을 두어 장기 실행 서버의 메모리 증가를 막음
+# 개별 비교용: 로드 시 만든 긴 표에서 (지표, 지역) 구간만 잘라 연도순 [지역, year, value] 반환
+@st.cache_data(show_spinner=False, max_entries=1000)
+def process_data_v2(region_level, regions: tuple, var_name):
+    long = LONG[region_level]
+    # 정렬된 인덱스에서 (지표, 지역)별 구간을 searchsorted로 찾음 (불리언 마스크 전체 스캔 없음)
+    parts = [long.iloc[slice(*long.index.slice_locs((var_name, r), (var_name, r)))] for r in regions]
+    return pd.concat(parts).reset_index() if parts else pd.DataFrame()
+
+# 분석 단위별 지역명 집합: 개별 비교에서 지역이 어느 시트에 있는지 바로 판별
+@st.cache_data(show_spinner=False)
+def region_set(region_level) -> frozenset:
+    df = df_sido if region_level == "시도" else df_sigungu
+    return frozenset(df[region_level].dropna())
+
+# 사이드바 지역 목록: 시트가 바뀌지 않는 한 동일하므로 rerun마다 unique/정렬하지 않도록 캐시
+@st.cache_data(show_spinner=False)
+def regions_of(region_level) -> list:
+    return sorted(str(x) for x in region_set(region_level))
+
+@st.cache_data(show_spinner=False)
+def sigungu_of(base_sido) -> list:
+    # 필요한 한 컬럼만 꺼냄 (넓은 시군구 표 전체를 행 필터로 복사하지 않음)
+    return sorted(df_sigungu.loc[df_sigungu['시군구별(1)'] == base_sido, '시군구'].unique().tolist())
+
+# 평균 추이용: 선택된 지표 전체를 한 번의 행 필터/집계로 처리해 {지표: (years, means)} 반환
+@st.cache_data(show_spinner=False, max_entries=200)
+def compute_all_avgs(region_level, regions: tuple, var_names: tuple):
+    df = df_sido if region_level == "시도" else df_sigungu
+    col_meta, base_cols = COL_META[region_level], BASE_COLS[region_level]
+    var_cols = {v: [c for c in base_cols.get(v, []) if col_meta[c][1] is not None] for v in var_names}
+    all_cols = [c for cols in var_cols.values() for c in cols]
+    if not all_cols: return {}
+    sub = df.loc[df[region_level].isin(regions), all_cols]
+    # 숫자형이 아닌('-' 등이 섞인) 컬럼만 변환
+    non_numeric = [c for c, dtype in sub.dtypes.items() if not is_numeric_dtype(dtype)]
+    if non_numeric:
+        sub = sub.assign(**{c: pd.to_numeric(sub[c], errors='coerce') for c in non_numeric})
+    col_sums, col_cnts = sub.sum(), sub.count()
+    results = {}
+    for var, cols in var_cols.items():
+        if not cols: continue
+        # 같은 연도에 컬럼이 여러 개여도 melt 후 평균과 동일하도록 합계/개수를 연도별로 합산
+        years, inv = np.unique(np.array([col_meta[c][1] for c in cols], dtype=np.int16), return_inverse=True)
+        sums = np.bincount(inv, weights=col_sums[cols].to_numpy())
+        cnts = np.bincount(inv, weights=col_cnts[cols].to_numpy())
+        has_data = cnts > 0
+        results[var] = (years[has_data], sums[has_data] / cnts[has_data])
+    return results
+
+# 트레이스당 브라우저로 보내는 최대 점 개수 (초과 시 LTTB로 축소, 두 보기 모드 공통)
+MAX_POINTS_PER_TRACE = 1500
+# 차트 전체 점 개수가 이보다 많으면 SVG(Scatter) 대신 WebGL(Scattergl)로 렌더링
+SCATTERGL_MIN_POINTS = 1000
+
+# Largest-Triangle-Three-Buckets: 선의 모양을 유지하면서 n_out개 점만 남기는 인덱스 반환 (x 정렬 가정)
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n <= n_out or n_out < 3: return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 다음 버킷의 평균점 (마지막 버킷은 끝점)
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
 
 # --- 3. 사이드바: 분석 단위 및 지역 선택 ---
 st.sidebar.title("🔍 분석 설정")
@@ -91,12 +251,14 @@ comparison_list = []
 base_sido = None
 
 if region_level == "시도":
-    all_sidos = sorted([str(x) for x in df_sido['시도'].unique() if pd.notna(x)])
-    comparison_list = st.sidebar.multiselect("비교 대상 시도 선택", all_sidos, default=["전국", "서울특별시"] if "전국" in all_sidos else [all_sidos[0]])
+    all_sidos = regions_of("시도")
+    # 첫 화면은 소수 지역만 기본 선택 (존재하는 항목만 사용)
+    default_regions = [r for r in ("전국", "서울특별시") if r in all_sidos] or all_sidos[:1]
+    comparison_list = st.sidebar.multiselect("비교 대상 시도 선택", all_sidos, default=default_regions)
 else:
-    all_sidos_for_filter = sorted([str(x) for x in df_sido['시도'].unique() if pd.notna(x) and x != "전국"])
+    all_sidos_for_filter = [x for x in regions_of("시도") if x != "전국"]
     base_sido = st.sidebar.selectbox("기준 시도(광역) 선택", all_sidos_for_filter)
-    available_sigungu = sorted(df_sigungu[df_sigungu['시군구별(1)'] == base_sido]['시군구'].unique().tolist())
+    available_sigungu = sigungu_of(base_sido)
     selected_sigungus = st.sidebar.multiselect(f"{base_sido} 내 세부 지자체 선택", available_sigungu)
     comparison_list = ["전국", base_sido] + selected_sigungus
 
@@ -105,18 +267,20 @@ st.title(f"📊 {region_level} 단위 통합 데이터 분석")
 
 selected_all_vars = []
 cols = st.columns(3)
-current_df = df_sido if region_level == "시도" else df_sigungu
 
-for i, (cat_name, keywords) in enumerate(VARIABLES_MAP.items()):
+cat_vars = category_vars(region_level)
+
+for i, cat_name in enumerate(VARIABLES_MAP):
     # 시군구 모드에서 KLoSA나 의료이용 등 시도 전용 지표는 자동으로 필터링됨
     with cols[i % 3]:
         with st.expander(cat_name, expanded=(cat_name == "7. KLoSA")):
-            var_list = get_unique_vars(keywords, current_df)
-            if not var_list and region_level == "시군구":
+            var_list = cat_vars[cat_name]
+            if var_list:
+                # 지표마다 체크박스를 만드는 대신 카테고리당 멀티셀렉트 하나로 위젯 호출을 묶음
+                # (선택 순서와 관계없이 목록 순서(정렬)로 모아, 체크박스 때처럼 첫 지표와 y/y2 축 배정이 유지되도록 함)
+                selected_all_vars.extend(sorted(st.multiselect(cat_name, var_list, key=f"ms_{region_level}_{i}", label_visibility="collapsed")))
+            elif region_level == "시군구":
                 st.caption("시군구 단위 데이터 없음")
-            for v in var_list:
-                if st.checkbox(v, key=f"chk_{region_level}_{v}"):
-                    selected_all_vars.append(v)
 
 st.divider()
 view_mode = st.radio("⚙️ 보기 모드", ["지역별 개별 비교", "지표별 평균 추이"], horizontal=True)
@@ -124,21 +288,29 @@ view_mode = st.radio("⚙️ 보기 모드", ["지역별 개별 비교", "지표
 # --- 5. 시각화 실행 ---
 if selected_all_vars and comparison_list:
     fig = go.Figure()
+    traces = [] # 전체 점 개수를 보고 트레이스 종류를 정하기 위해 먼저 모아둠
     
     if "개별 비교" in view_mode:
         target_var = selected_all_vars[0]
+        sido_regions, sigungu_regions = region_set("시도"), region_set("시군구")
         for reg in comparison_list:
+            # 해당 시트에 없는 지역은 필터링/melt 없이 건너뜀
+            data = pd.DataFrame()
             # 1. 시도/KLoSA 데이터 검색
-            data = process_data_v2(df_sido, [reg], target_var, "시도")
+            if reg in sido_regions:
+                data = process_data_v2("시도", (reg,), target_var)
             # 2. 시군구 데이터 검색
-            if data.empty:
-                data = process_data_v2(df_sigungu, [reg], target_var, "시군구")
+            if data.empty and reg in sigungu_regions:
+                data = process_data_v2("시군구", (reg,), target_var)
             
             # 전국값 보완 로직 (데이터가 비어있는 경우 시도평균 계산)
-            if reg == "전국" and (data.empty or data['value'].isnull().all()):
-                all_sido_data = process_data_v2(df_sido, [s for s in df_sido['시도'].unique() if s != "전국"], target_var, "시도")
+            if reg == "전국" and data.empty: # 긴 표는 결측값을 미리 제거하므로 비어 있는지만 확인
+                all_sido_data = process_data_v2("시도", tuple(r for r in regions_of("시도") if r != "전국"), target_var)
                 if not all_sido_data.empty:
-                    data = all_sido_data.groupby('year')['value'].mean().reset_index()
+                    # 연도별 평균: GroupBy 객체 없이 np.unique + bincount로 계산 (연도는 정렬된 상태로 반환)
+                    years, inv = np.unique(all_sido_data['year'].to_numpy(), return_inverse=True)
+                    sums = np.bincount(inv, weights=all_sido_data['value'].to_numpy(dtype=float))
+                    data = pd.DataFrame({'year': years, 'value': sums / np.bincount(inv)})
                     reg_label = "전국(시도평균)"
                 else: continue
             else:
@@ -146,21 +318,33 @@ if selected_all_vars and comparison_list:
 
             if not data.empty:
                 width = 4 if "전국" in reg_label else (2.5 if reg == base_sido else 1.5)
-                fig.add_trace(go.Scatter(x=data['year'], y=data['value'], name=reg_label, mode='lines+markers', line=dict(width=width)))
+                traces.append(dict(x=data['year'], y=data['value'], name=reg_label, mode='lines+markers', line=dict(width=width)))
         
         fig.update_layout(title=f"<b>{target_var}</b> 지역별 추이")
     
     else:
         # 지표별 평균 추이
+        avgs = compute_all_avgs(region_level, tuple(sorted(comparison_list)), tuple(selected_all_vars))
         for i, var in enumerate(selected_all_vars):
-            data_all = process_data_v2(current_df, comparison_list, var, "시도" if region_level=="시도" else "시군구")
-            if data_all.empty: continue
-            avg_data = data_all.groupby('year')['value'].mean().reset_index()
+            years, means = avgs.get(var, ((), ()))
+            if len(years) == 0: continue
             yaxis_type = "y2" if i >= 1 else "y"
-            fig.add_trace(go.Scatter(x=avg_data['year'], y=avg_data['value'], name=f"{var} (평균)", mode='lines+markers', yaxis=yaxis_type))
+            traces.append(dict(x=years, y=means, name=f"{var} (평균)", mode='lines+markers', yaxis=yaxis_type))
         fig.update_layout(yaxis2=dict(anchor="x", overlaying="y", side="right", showgrid=False))
 
-    fig.update_layout(xaxis=dict(title="연도", dtick=1 if region_level == "시도" else 1), yaxis=dict(title="값"), hovermode="x unified", template="plotly_white", height=600)
-    st.plotly_chart(fig, use_container_width=True)
+    # 트레이스별 점 개수 상한(LTTB)은 직렬화 직전 마지막 단계에서 적용해 모든 트레이스에 보장
+    # ndarray/Series는 typed array(bdata)로 직렬화되어 Plotly.js가 매번 정리 과정을 거치므로 일반 리스트로 넘김
+    for t in traces:
+        x, y = np.asarray(t['x']), np.asarray(t['y'])
+        if len(x) > MAX_POINTS_PER_TRACE:
+            keep = lttb_indices(x.astype(float), y.astype(float), MAX_POINTS_PER_TRACE)
+            x, y = x[keep], y[keep]
+        t['x'], t['y'] = x.tolist(), y.tolist()
+    trace_cls = go.Scattergl if sum(len(t['x']) for t in traces) > SCATTERGL_MIN_POINTS else go.Scatter
+    fig.add_traces([trace_cls(**t) for t in traces])
+    # 같은 분석 단위/보기 모드/지표 조합이면 지역을 바꿔도 확대·이동 상태를 유지하고, 차트 요소도 고정 key로 재사용
+    ui_rev = f"{region_level}|{view_mode}|{'|'.join(selected_all_vars)}"
+    fig.update_layout(xaxis=dict(title="연도", dtick=1), yaxis=dict(title="값"), hovermode="x unified", template="plotly_white", height=600, uirevision=ui_rev)
+    st.plotly_chart(fig, use_container_width=True, key="main_chart")
 else:
     st.info("👈 왼쪽에서 분석할 지역을 선택하고 상단에서 KLoSA 등 지표를 클릭하세요.")